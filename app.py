@@ -1,239 +1,392 @@
 import streamlit as st
 import re
+import string
+import sys
+import functools
+import gzip
+import hashlib
+import io
 import json
+import threading
+import orjson
 import requests
-from typing import Dict, List, Any
+from collections import OrderedDict
+from typing import Dict, List, Any, Callable, Optional, TextIO
+# The SDK builds response schemas with pydantic, which rejects typing.TypedDict before 3.12
+from typing_extensions import TypedDict
 import time
 from datetime import datetime
-import google.generativeai as genai
 
-# Configure Gemini API
-class GeminiWebsiteGenerator:
-    def __init__(self, api_key: str):
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-2.0-flash-exp')
-        
-    def generate_website_structure(self, user_prompt: str, color_scheme: str = "primary", layout_type: str = "default") -> Dict[str, Any]:
-        """Generate website structure using Gemini 2.0 Flash with enhanced thinking"""
-        
-        system_prompt = f"""
-        You are an expert web developer and UI/UX designer specializing in CampEd UI components. 
-        Generate a complete, modern website structure based on user input using ONLY CampEd UI components.
-        
-        Think step by step about:
-        1. What type of website this is
-        2. What sections would be most effective
-        3. How to organize content logically
-        4. Which CampEd UI components best serve each purpose
-        5. How to make it visually appealing and functional
-        
-        Available CampEd UI Components:
-        - Button: Primary, Secondary, Outline, Ghost variants (with hover effects)
-        - Card: With header, content, footer (supports images and actions)
-        - Typography: Heading (h1-h6), Paragraph, Small text (with proper hierarchy)
-        - Navigation: Menu, Breadcrumb (responsive and accessible)
-        - Form: Input, Textarea, Select, Checkbox, Radio (with validation states)
-        - Alert: Success, Error, Warning, Info (with icons)
-        - Badge: Default, Secondary, Destructive, Outline (for status indicators)
-        - Dialog: Modal, Drawer (for interactions)
-        - Tabs: Horizontal, Vertical (for content organization)
-        - Separator: Horizontal, Vertical (for visual breaks)
-        - Avatar: Image, Fallback (for user representation)
-        - Progress: Linear, Circular (for loading states)
-        - Skeleton: Loading states (for better UX)
-        - Grid: Responsive layouts (2, 3, 4 columns)
-        - Hero: Large impact sections
-        - Gallery: Image showcases
-        - Testimonials: Customer feedback
-        - FAQ: Collapsible question sections
-        
-        IMPORTANT: Use color scheme "{color_scheme}" and layout type "{layout_type}".
-        
-        Always respond with valid JSON structure containing:
+# Design options offered in the sidebar
+COLOR_SCHEMES = ("primary", "secondary", "accent")
+LAYOUT_TYPES = ("default", "centered", "wide")
+
+# System prompt sent with every generation; formatted once per (color scheme, layout)
+_SYSTEM_PROMPT_TEMPLATE = """
+You are an expert web developer and UI/UX designer specializing in CampEd UI components. 
+Generate a complete, modern website structure based on user input using ONLY CampEd UI components.
+
+Think step by step about:
+1. What type of website this is
+2. What sections would be most effective
+3. How to organize content logically
+4. Which CampEd UI components best serve each purpose
+5. How to make it visually appealing and functional
+
+Available CampEd UI Components:
+- Button: Primary, Secondary, Outline, Ghost variants (with hover effects)
+- Card: With header, content, footer (supports images and actions)
+- Typography: Heading (h1-h6), Paragraph, Small text (with proper hierarchy)
+- Navigation: Menu, Breadcrumb (responsive and accessible)
+- Form: Input, Textarea, Select, Checkbox, Radio (with validation states)
+- Alert: Success, Error, Warning, Info (with icons)
+- Badge: Default, Secondary, Destructive, Outline (for status indicators)
+- Dialog: Modal, Drawer (for interactions)
+- Tabs: Horizontal, Vertical (for content organization)
+- Separator: Horizontal, Vertical (for visual breaks)
+- Avatar: Image, Fallback (for user representation)
+- Progress: Linear, Circular (for loading states)
+- Skeleton: Loading states (for better UX)
+- Grid: Responsive layouts (2, 3, 4 columns)
+- Hero: Large impact sections
+- Gallery: Image showcases
+- Testimonials: Customer feedback
+- FAQ: Collapsible question sections
+
+IMPORTANT: Use color scheme "{color_scheme}" and layout type "{layout_type}".
+
+Always respond with valid JSON structure containing:
+{{
+    "title": "Website title",
+    "description": "Meta description",
+    "sections": [
         {{
-            "title": "Website title",
-            "description": "Meta description",
-            "sections": [
-                {{
-                    "type": "hero|navigation|content|cards|contact|footer|gallery|testimonials|faq|features",
-                    "title": "Section title",
-                    "content": "Section content",
-                    "components": ["component1", "component2"],
-                    "props": {{
-                        "variant": "primary|secondary|outline",
-                        "size": "sm|md|lg",
-                        "color": "{color_scheme}",
-                        "layout": "{layout_type}",
-                        "cards": [
-                            {{
-                                "title": "Card title",
-                                "content": "Card description",
-                                "image": "placeholder-url",
-                                "footer": "Card footer with actions"
-                            }}
-                        ],
-                        "links": [
-                            {{
-                                "text": "Link text",
-                                "href": "#section"
-                            }}
-                        ],
-                        "fields": [
-                            {{
-                                "type": "text|email|tel|textarea",
-                                "name": "field_name",
-                                "label": "Field Label",
-                                "placeholder": "Enter..."
-                            }}
-                        ]
+            "type": "hero|navigation|content|cards|contact|footer|gallery|testimonials|faq|features",
+            "title": "Section title",
+            "content": "Section content",
+            "components": ["component1", "component2"],
+            "props": {{
+                "variant": "primary|secondary|outline",
+                "size": "sm|md|lg",
+                "color": "{color_scheme}",
+                "layout": "{layout_type}",
+                "cards": [
+                    {{
+                        "title": "Card title",
+                        "content": "Card description",
+                        "image": "placeholder-url",
+                        "footer": "Card footer with actions"
+                    }}
+                ],
+                "links": [
+                    {{
+                        "text": "Link text",
+                        "href": "#section"
+                    }}
+                ],
+                "fields": [
+                    {{
+                        "type": "text|email|tel|textarea",
+                        "name": "field_name",
+                        "label": "Field Label",
+                        "placeholder": "Enter..."
                     }}
-                }}
-            ],
-            "color_scheme": "{color_scheme}",
-            "layout": "{layout_type}"
+                ]
+            }}
         }}
-        
-        Make the website modern, accessible, and fully functional. Include realistic content and proper component usage.
-        """
-        
-        try:
-            response = self.model.generate_content(
-                f"{system_prompt}\n\nUser Request: {user_prompt}",
-                generation_config=genai.types.GenerationConfig(
-                    temperature=0.7,
-                    top_p=0.9,
-                    max_output_tokens=4096,
-                )
-            )
-            
-            # Parse JSON response
-            response_text = response.text.strip()
-            if response_text.startswith('```json'):
-                response_text = response_text[7:-3]
-            elif response_text.startswith('```'):
-                response_text = response_text[3:-3]
-                
-            parsed_structure = json.loads(response_text)
-            
-            # Ensure color scheme and layout are applied
-            parsed_structure["color_scheme"] = color_scheme
-            parsed_structure["layout"] = layout_type
-            
-            return parsed_structure
-            
-        except Exception as e:
-            st.error(f"Gemini API Error: {str(e)}")
-            return self._get_fallback_structure(user_prompt, color_scheme, layout_type)
-    
-    def _get_fallback_structure(self, prompt: str, color_scheme: str, layout_type: str) -> Dict[str, Any]:
-        """Enhanced fallback structure when API fails"""
-        return {
-            "title": "AI Generated Website",
-            "description": f"Generated using CampEd UI components with {color_scheme} theme",
-            "sections": [
-                {
-                    "type": "navigation",
-                    "title": "Navigation",
-                    "content": "",
-                    "components": ["Navigation"],
-                    "props": {
-                        "links": [
-                            {"text": "Home", "href": "#home"},
-                            {"text": "About", "href": "#about"},
-                            {"text": "Services", "href": "#services"},
-                            {"text": "Contact", "href": "#contact"}
-                        ]
-                    }
-                },
-                {
-                    "type": "hero",
-                    "title": "Welcome to Your AI Website",
-                    "content": "This website was generated using advanced AI and CampEd UI components",
-                    "components": ["Button", "Typography"],
-                    "props": {"variant": color_scheme, "size": "lg"}
-                },
-                {
-                    "type": "features",
-                    "title": "Key Features",
-                    "content": "Discover what makes us special",
-                    "components": ["Card", "Grid"],
-                    "props": {
-                        "cards": [
-                            {
-                                "title": "Modern Design",
-                                "content": "Built with the latest design principles",
-                                "footer": "Learn More"
-                            },
-                            {
-                                "title": "Responsive",
-                                "content": "Works perfectly on all devices",
-                                "footer": "View Demo"
-                            },
-                            {
-                                "title": "Fast Loading",
-                                "content": "Optimized for speed and performance",
-                                "footer": "Test Speed"
-                            }
-                        ]
-                    }
-                },
-                {
-                    "type": "contact",
-                    "title": "Get In Touch",
-                    "content": "We'd love to hear from you",
-                    "components": ["Form", "Button"],
-                    "props": {
-                        "fields": [
-                            {"type": "text", "name": "name", "label": "Full Name", "placeholder": "Enter your name"},
-                            {"type": "email", "name": "email", "label": "Email", "placeholder": "Enter your email"},
-                            {"type": "textarea", "name": "message", "label": "Message", "placeholder": "Your message"}
-                        ]
-                    }
-                }
-            ],
-            "color_scheme": color_scheme,
-            "layout": layout_type
-        }
+    ],
+    "color_scheme": "{color_scheme}",
+    "layout": "{layout_type}"
+}}
+
+Make the website modern, accessible, and fully functional. Include realistic content and proper component usage.
+"""
+
+# Streamlit re-executes this script on every rerun, so the memo has to live in
+# Streamlit's cache rather than an lru_cache that would start empty each time
+@st.cache_resource(show_spinner=False)
+def _system_prompt(color_scheme: str, layout_type: str) -> str:
+    return _SYSTEM_PROMPT_TEMPLATE.format(color_scheme=color_scheme, layout_type=layout_type)
+
+class SectionStreamParser:
+    """Incrementally extracts complete section objects from a streamed JSON response"""
+
+    _SECTIONS_START = re.compile(r'"sections"\s*:\s*\[')
 
-class CampEdUIGenerator:
-    """Enhanced CampEd UI Component Generator with real styling"""
-    
     def __init__(self):
-        self.base_cdn = "https://cdn.jsdelivr.net/npm/@camped/ui@latest"
-        
-    def get_camped_css(self, color_scheme: str = "primary") -> str:
-        """Get enhanced CampEd UI CSS with color schemes"""
-        
-        color_vars = {
-            "primary": {
-                "primary": "#2563eb",
-                "primary-foreground": "#ffffff",
-                "accent": "#1d4ed8"
+        self.sections: List[Dict[str, Any]] = []
+        self._decoder = json.JSONDecoder()
+        self._chunks: List[str] = []
+        self._pending: List[str] = []
+        self._started = False
+        self._done = False
+
+    @property
+    def text(self) -> str:
+        """The full response received so far"""
+        return "".join(self._chunks)
+
+    def feed(self, chunk: str) -> bool:
+        """Append a chunk of the response; returns True when new sections became available"""
+        self._chunks.append(chunk)
+        if self._done:
+            return False
+        self._pending.append(chunk)
+
+        # The array opening, or a section, can only complete in a chunk carrying its closing bracket
+        needle = "}" if self._started else "["
+        if needle not in chunk:
+            return False
+
+        tail = "".join(self._pending)
+        self._pending = [tail]
+        if not self._started:
+            match = self._SECTIONS_START.search(tail)
+            if not match:
+                return False
+            tail = tail[match.end():]
+            self._started = True
+
+        found = False
+        while True:
+            # Skip separators between array items
+            tail = tail.lstrip(" \t\r\n,")
+            if not tail:
+                break
+            if tail[0] == "]":
+                self._done = True
+                break
+
+            try:
+                section, end = self._decoder.raw_decode(tail)
+            except json.JSONDecodeError:
+                # Section is still incomplete - wait for more chunks
+                break
+
+            if isinstance(section, dict):
+                self.sections.append(section)
+                found = True
+            tail = tail[end:]
+
+        self._pending = [tail]
+        return found
+
+# Response schema passed to Gemini; mirrors the JSON layout in the system prompt
+class Card(TypedDict):
+    title: str
+    content: str
+    image: str
+    footer: str
+
+class Link(TypedDict):
+    text: str
+    href: str
+
+class FormField(TypedDict):
+    type: str
+    name: str
+    label: str
+    placeholder: str
+
+class SectionProps(TypedDict, total=False):
+    variant: str
+    size: str
+    color: str
+    layout: str
+    cards: List[Card]
+    links: List[Link]
+    fields: List[FormField]
+
+class Section(TypedDict):
+    type: str
+    title: str
+    content: str
+    components: List[str]
+    props: SectionProps
+
+class WebsiteStructure(TypedDict):
+    title: str
+    description: str
+    sections: List[Section]
+    color_scheme: str
+    layout: str
+
+@st.cache_resource(show_spinner=False)
+def _fallback_structure(color_scheme: str, layout_type: str) -> Dict[str, Any]:
+    """Fallback structure for API failures; shared per (color scheme, layout), so never mutated"""
+    return {
+        "title": "AI Generated Website",
+        "description": f"Generated using CampEd UI components with {color_scheme} theme",
+        "sections": [
+            {
+                "type": "navigation",
+                "title": "Navigation",
+                "content": "",
+                "components": ["Navigation"],
+                "props": {
+                    "links": [
+                        {"text": "Home", "href": "#home"},
+                        {"text": "About", "href": "#about"},
+                        {"text": "Services", "href": "#services"},
+                        {"text": "Contact", "href": "#contact"}
+                    ]
+                }
             },
-            "secondary": {
-                "primary": "#64748b", 
-                "primary-foreground": "#ffffff",
-                "accent": "#475569"
+            {
+                "type": "hero",
+                "title": "Welcome to Your AI Website",
+                "content": "This website was generated using advanced AI and CampEd UI components",
+                "components": ["Button", "Typography"],
+                "props": {"variant": color_scheme, "size": "lg"}
             },
-            "accent": {
-                "primary": "#f59e0b",
-                "primary-foreground": "#ffffff", 
-                "accent": "#d97706"
+            {
+                "type": "features",
+                "title": "Key Features",
+                "content": "Discover what makes us special",
+                "components": ["Card", "Grid"],
+                "props": {
+                    "cards": [
+                        {
+                            "title": "Modern Design",
+                            "content": "Built with the latest design principles",
+                            "footer": "Learn More"
+                        },
+                        {
+                            "title": "Responsive",
+                            "content": "Works perfectly on all devices",
+                            "footer": "View Demo"
+                        },
+                        {
+                            "title": "Fast Loading",
+                            "content": "Optimized for speed and performance",
+                            "footer": "Test Speed"
+                        }
+                    ]
+                }
+            },
+            {
+                "type": "contact",
+                "title": "Get In Touch",
+                "content": "We'd love to hear from you",
+                "components": ["Form", "Button"],
+                "props": {
+                    "fields": [
+                        {"type": "text", "name": "name", "label": "Full Name", "placeholder": "Enter your name"},
+                        {"type": "email", "name": "email", "label": "Email", "placeholder": "Enter your email"},
+                        {"type": "textarea", "name": "message", "label": "Message", "placeholder": "Your message"}
+                    ]
+                }
             }
-        }
+        ],
+        "color_scheme": color_scheme,
+        "layout": layout_type
+    }
+
+# Configure Gemini API
+@functools.lru_cache(maxsize=None)
+def _genai():
+    """Import the Gemini SDK on first use, so startup without an API key skips it"""
+    import google.generativeai as genai
+    return genai
+
+@st.cache_resource(show_spinner=False)
+def _get_model(api_key: str):
+    """One shared model per API key, bound to its own client (and gRPC channel)
+
+    ``genai.configure`` sets a process-wide key that a model only picks up on its
+    first request, so concurrent sessions could bind each other's keys. The model
+    gets a client for this key instead, assigned to the private
+    ``GenerativeModel._client`` attribute; requirements.txt caps the SDK at the
+    releases checked to keep it (0.5.3 - 0.8.x).
+    """
+    from google.ai import generativelanguage as glm
+    model = _genai().GenerativeModel('gemini-2.0-flash-exp')
+    model._client = glm.GenerativeServiceClient(client_options={"api_key": api_key})
+    return model
+
+class GeminiWebsiteGenerator:
+    def __init__(self, api_key: str):
+        self.model = _get_model(api_key)
         
-        colors = color_vars.get(color_scheme, color_vars["primary"])
+    def generate_website_structure(self, user_prompt: str, color_scheme: str = "primary", layout_type: str = "default",
+                                   on_section: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """Generate website structure using Gemini 2.0 Flash with enhanced thinking
+
+        The response is streamed; ``on_section`` is called with the partial structure
+        every time a new complete section arrives. API and parse errors are raised so
+        callers can fall back without caching the failure.
+        """
         
-        return f"""
+        system_prompt = _system_prompt(color_scheme, layout_type)
+        
+        response = self.model.generate_content(
+            f"{system_prompt}\n\nUser Request: {user_prompt}",
+            generation_config=_genai().types.GenerationConfig(
+                temperature=0.7,
+                top_p=0.9,
+                max_output_tokens=4096,
+                response_mime_type="application/json",
+                response_schema=WebsiteStructure,
+            ),
+            stream=True
+        )
+
+        # Parse sections as they arrive so the preview can render early
+        parser = SectionStreamParser()
+        for chunk in response:
+            # Chunks carrying only a finish reason or metadata have no parts, and .text raises on them
+            if not (chunk.candidates and chunk.parts):
+                continue
+            if parser.feed(chunk.text) and on_section:
+                on_section({
+                    "sections": list(parser.sections),
+                    "color_scheme": color_scheme,
+                    "layout": layout_type
+                })
+
+        # JSON mode replies are bare JSON; orjson skips surrounding whitespace itself
+        parsed_structure = orjson.loads(parser.text)
+        
+        # Ensure color scheme and layout are applied
+        parsed_structure["color_scheme"] = color_scheme
+        parsed_structure["layout"] = layout_type
+        
+        return parsed_structure
+
+# Font Awesome + base reset; identical for every color scheme
+_CSS_HEAD = """
         <link href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css" rel="stylesheet">
         <style>
         /* CampEd UI Enhanced Styles */
-        * {{
+        * {
             margin: 0;
             padding: 0;
             box-sizing: border-box;
-        }}
+        }
         
+"""
+
+_COLOR_VARS = {
+    "primary": {
+        "primary": "#2563eb",
+        "primary-foreground": "#ffffff",
+        "accent": "#1d4ed8"
+    },
+    "secondary": {
+        "primary": "#64748b",
+        "primary-foreground": "#ffffff",
+        "accent": "#475569"
+    },
+    "accent": {
+        "primary": "#f59e0b",
+        "primary-foreground": "#ffffff",
+        "accent": "#d97706"
+    }
+}
+
+def _root_vars(colors: Dict[str, str]) -> str:
+    """Render the :root variable block, the only color-dependent part of the CSS"""
+    return f"""
         :root {{
             --camped-primary: {colors["primary"]};
             --camped-primary-foreground: {colors["primary-foreground"]};
@@ -252,35 +405,39 @@ class CampEdUIGenerator:
             --camped-card: #ffffff;
             --camped-card-foreground: #0f172a;
         }}
+"""
+
+# Component styles; plain string (not an f-string) so it is never re-formatted
+_CSS_STATIC = """
         
-        body {{
+        body {
             font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
             line-height: 1.6;
             color: var(--camped-foreground);
             background: var(--camped-background);
-        }}
+        }
         
-        .camped-container {{
+        .camped-container {
             max-width: 1200px;
             margin: 0 auto;
             padding: 0 1rem;
-        }}
+        }
         
-        .camped-section {{
+        .camped-section {
             padding: 4rem 0;
-        }}
+        }
         
-        .camped-grid {{
+        .camped-grid {
             display: grid;
             gap: 2rem;
-        }}
+        }
         
-        .camped-grid-2 {{ grid-template-columns: repeat(auto-fit, minmax(300px, 1fr)); }}
-        .camped-grid-3 {{ grid-template-columns: repeat(auto-fit, minmax(250px, 1fr)); }}
-        .camped-grid-4 {{ grid-template-columns: repeat(auto-fit, minmax(200px, 1fr)); }}
+        .camped-grid-2 { grid-template-columns: repeat(auto-fit, minmax(300px, 1fr)); }
+        .camped-grid-3 { grid-template-columns: repeat(auto-fit, minmax(250px, 1fr)); }
+        .camped-grid-4 { grid-template-columns: repeat(auto-fit, minmax(200px, 1fr)); }
         
         /* Navigation */
-        .camped-navigation {{
+        .camped-navigation {
             background: var(--camped-background);
             border-bottom: 1px solid var(--camped-border);
             padding: 1rem 0;
@@ -288,38 +445,38 @@ class CampEdUIGenerator:
             top: 0;
             z-index: 100;
             backdrop-filter: blur(10px);
-        }}
+        }
         
-        .camped-nav-container {{
+        .camped-nav-container {
             display: flex;
             justify-content: space-between;
             align-items: center;
-        }}
+        }
         
-        .camped-nav__brand {{
+        .camped-nav__brand {
             font-size: 1.5rem;
             font-weight: bold;
             color: var(--camped-primary);
-        }}
+        }
         
-        .camped-nav__menu {{
+        .camped-nav__menu {
             display: flex;
             gap: 2rem;
-        }}
+        }
         
-        .camped-nav__link {{
+        .camped-nav__link {
             text-decoration: none;
             color: var(--camped-foreground);
             font-weight: 500;
             transition: color 0.2s;
-        }}
+        }
         
-        .camped-nav__link:hover {{
+        .camped-nav__link:hover {
             color: var(--camped-primary);
-        }}
+        }
         
         /* Buttons */
-        .camped-button {{
+        .camped-button {
             display: inline-flex;
             align-items: center;
             justify-content: center;
@@ -331,368 +488,365 @@ class CampEdUIGenerator:
             cursor: pointer;
             transition: all 0.2s;
             font-size: 0.875rem;
-        }}
+        }
         
-        .camped-button--default {{
+        .camped-button--default {
             background: var(--camped-primary);
             color: var(--camped-primary-foreground);
-        }}
+        }
         
-        .camped-button--default:hover {{
+        .camped-button--default:hover {
             background: var(--camped-accent);
             transform: translateY(-1px);
-        }}
+        }
         
-        .camped-button--outline {{
+        .camped-button--outline {
             border-color: var(--camped-primary);
             color: var(--camped-primary);
             background: transparent;
-        }}
+        }
         
-        .camped-button--outline:hover {{
+        .camped-button--outline:hover {
             background: var(--camped-primary);
             color: var(--camped-primary-foreground);
-        }}
+        }
         
-        .camped-button--lg {{
+        .camped-button--lg {
             padding: 0.75rem 2rem;
             font-size: 1rem;
-        }}
+        }
         
         /* Cards */
-        .camped-card {{
+        .camped-card {
             background: var(--camped-card);
             border: 1px solid var(--camped-border);
             border-radius: 0.5rem;
             overflow: hidden;
             transition: transform 0.2s, box-shadow 0.2s;
-        }}
+        }
         
-        .camped-card:hover {{
+        .camped-card:hover {
             transform: translateY(-2px);
             box-shadow: 0 10px 25px rgba(0,0,0,0.1);
-        }}
+        }
         
-        .camped-card__header {{
+        .camped-card__header {
             padding: 1.5rem 1.5rem 0;
-        }}
+        }
         
-        .camped-card__title {{
+        .camped-card__title {
             font-size: 1.25rem;
             font-weight: 600;
             color: var(--camped-card-foreground);
             margin-bottom: 0.5rem;
-        }}
+        }
         
-        .camped-card__content {{
+        .camped-card__content {
             padding: 0 1.5rem 1.5rem;
-        }}
+        }
         
-        .camped-card__description {{
+        .camped-card__description {
             color: var(--camped-muted-foreground);
             line-height: 1.5;
-        }}
+        }
         
-        .camped-card__footer {{
+        .camped-card__footer {
             padding: 1rem 1.5rem;
             background: var(--camped-muted);
             border-top: 1px solid var(--camped-border);
-        }}
+        }
         
         /* Typography */
-        .camped-typography--h1 {{
+        .camped-typography--h1 {
             font-size: 2.5rem;
             font-weight: 700;
             line-height: 1.2;
             margin-bottom: 1rem;
-        }}
+        }
         
-        .camped-typography--h2 {{
+        .camped-typography--h2 {
             font-size: 2rem;
             font-weight: 600;
             line-height: 1.3;
             margin-bottom: 1rem;
-        }}
+        }
         
-        .camped-typography--p {{
+        .camped-typography--p {
             font-size: 1rem;
             line-height: 1.6;
             margin-bottom: 1rem;
             color: var(--camped-muted-foreground);
-        }}
+        }
         
         /* Hero Section */
-        .camped-hero {{
+        .camped-hero {
             background: linear-gradient(135deg, var(--camped-primary), var(--camped-accent));
             color: white;
             text-align: center;
             padding: 6rem 0;
-        }}
+        }
         
-        .camped-hero__content {{
+        .camped-hero__content {
             max-width: 800px;
             margin: 0 auto;
-        }}
+        }
         
-        .camped-hero h1 {{
+        .camped-hero h1 {
             color: white;
             font-size: 3rem;
             margin-bottom: 1rem;
-        }}
+        }
         
-        .camped-hero p {{
+        .camped-hero p {
             color: rgba(255,255,255,0.9);
             font-size: 1.2rem;
             margin-bottom: 2rem;
-        }}
+        }
         
-        .camped-hero__actions {{
+        .camped-hero__actions {
             display: flex;
             gap: 1rem;
             justify-content: center;
             flex-wrap: wrap;
-        }}
+        }
         
         /* Forms */
-        .camped-form {{
+        .camped-form {
             max-width: 500px;
             margin: 0 auto;
-        }}
+        }
         
-        .camped-form__group {{
+        .camped-form__group {
             margin-bottom: 1.5rem;
-        }}
+        }
         
-        .camped-label {{
+        .camped-label {
             display: block;
             font-weight: 500;
             margin-bottom: 0.5rem;
             color: var(--camped-foreground);
-        }}
+        }
         
-        .camped-input, .camped-textarea {{
+        .camped-input, .camped-textarea {
             width: 100%;
             padding: 0.75rem;
             border: 1px solid var(--camped-border);
             border-radius: 0.375rem;
             font-size: 1rem;
             transition: border-color 0.2s, box-shadow 0.2s;
-        }}
+        }
         
-        .camped-input:focus, .camped-textarea:focus {{
+        .camped-input:focus, .camped-textarea:focus {
             outline: none;
             border-color: var(--camped-primary);
             box-shadow: 0 0 0 3px rgba(37, 99, 235, 0.1);
-        }}
+        }
         
-        .camped-textarea {{
+        .camped-textarea {
             min-height: 120px;
             resize: vertical;
-        }}
+        }
         
-        .camped-form__actions {{
+        .camped-form__actions {
             text-align: center;
             margin-top: 2rem;
-        }}
+        }
         
         /* Responsive Design */
-        @media (max-width: 768px) {{
-            .camped-section {{ padding: 2rem 0; }}
-            .camped-grid {{ gap: 1rem; }}
-            .camped-hero h1 {{ font-size: 2rem; }}
-            .camped-nav__menu {{ 
+        @media (max-width: 768px) {
+            .camped-section { padding: 2rem 0; }
+            .camped-grid { gap: 1rem; }
+            .camped-hero h1 { font-size: 2rem; }
+            .camped-nav__menu { 
                 flex-direction: column;
                 gap: 1rem;
-            }}
-            .camped-hero__actions {{
+            }
+            .camped-hero__actions {
                 flex-direction: column;
                 align-items: center;
-            }}
-        }}
+            }
+        }
         
         /* Animations */
-        @keyframes fadeInUp {{
-            from {{
+        @keyframes fadeInUp {
+            from {
                 opacity: 0;
                 transform: translateY(30px);
-            }}
-            to {{
+            }
+            to {
                 opacity: 1;
                 transform: translateY(0);
-            }}
-        }}
+            }
+        }
         
-        .fade-in-up {{
+        .fade-in-up {
             animation: fadeInUp 0.6s ease-out;
-        }}
+        }
         </style>
-        """
-    
-    def generate_button(self, text: str, variant: str = "default", size: str = "default") -> str:
-        """Generate CampEd UI Button with enhanced styling"""
-        return f'<button class="camped-button camped-button--{variant} camped-button--{size}">{text}</button>'
-    
-    def generate_card(self, title: str, content: str, footer: str = "") -> str:
-        """Generate CampEd UI Card with enhanced styling"""
-        footer_html = f'<div class="camped-card__footer">{footer}</div>' if footer else ''
-        return f'''
+"""
+
+@st.cache_resource(show_spinner=False)
+def _css_by_scheme() -> Dict[str, str]:
+    """Complete stylesheet for every color scheme, built once per server process"""
+    return {
+        scheme: _CSS_HEAD + _root_vars(colors) + _CSS_STATIC
+        for scheme, colors in _COLOR_VARS.items()
+    }
+
+# Single-pass HTML escaping for model-provided text
+_HTML_ESCAPE_TABLE = str.maketrans({
+    "&": "&amp;",
+    "<": "&lt;",
+    ">": "&gt;",
+    '"': "&quot;",
+    "'": "&#39;"
+})
+
+def esc(value: Any) -> str:
+    """Escape text for use in HTML content and attribute values"""
+    return str(value).translate(_HTML_ESCAPE_TABLE)
+
+# Links may be fragments, relative paths or http(s) URLs; anything else (javascript:,
+# data:, ...) becomes "#". Browsers ignore control characters and spaces inside a
+# scheme, so they are dropped before the scheme is read.
+_URL_IGNORED_CHARS = re.compile(r"[\x00-\x20]+")
+_URL_SCHEME = re.compile(r"([a-z][a-z0-9+.\-]*):", re.IGNORECASE)
+
+def safe_href(value: Any) -> str:
+    """Escaped link target, or "#" when it uses a scheme other than http(s)"""
+    href = str(value).strip()
+    scheme = _URL_SCHEME.match(_URL_IGNORED_CHARS.sub("", href))
+    if scheme and scheme.group(1).lower() not in ("http", "https"):
+        return "#"
+    return esc(href)
+
+# Precomputed opening/closing tags for each typography variant; interned so every
+# heading or paragraph in a page shares the same string objects
+_TYPOGRAPHY_TAGS = {
+    variant: (sys.intern(f'<{variant} class="camped-typography--{variant}">'), sys.intern(f'</{variant}>'))
+    for variant in ("h1", "h2", "h3", "h4", "h5", "h6", "p")
+}
+
+# Precomputed (interned) opening tags for each (variant, size) button combination
+_BUTTON_TAGS = {
+    (variant, size): sys.intern(f'<button class="camped-button camped-button--{variant} camped-button--{size}">')
+    for variant in ("default", "secondary", "outline", "ghost")
+    for size in ("default", "sm", "md", "lg")
+}
+
+# Markup skeletons, parsed once; values are escaped by the caller before substitution
+_CARD_TEMPLATE = string.Template('''
         <div class="camped-card fade-in-up">
             <div class="camped-card__header">
-                <h3 class="camped-card__title">{title}</h3>
+                <h3 class="camped-card__title">$title</h3>
             </div>
             <div class="camped-card__content">
-                <p class="camped-card__description">{content}</p>
+                <p class="camped-card__description">$content</p>
             </div>
-            {footer_html}
+            $footer
         </div>
-        '''
-    
-    def generate_typography(self, text: str, variant: str = "p") -> str:
-        """Generate CampEd UI Typography"""
-        return f'<{variant} class="camped-typography--{variant}">{text}</{variant}>'
-    
-    def generate_navigation(self, brand: str, links: List[Dict[str, str]]) -> str:
-        """Generate CampEd UI Navigation with enhanced styling"""
-        nav_items = ""
-        for link in links:
-            nav_items += f'<a href="{link.get("href", "#")}" class="camped-nav__link">{link.get("text", "")}</a>'
-        
-        return f'''
+        ''')
+
+_NAVIGATION_TEMPLATE = string.Template('''
         <nav class="camped-navigation">
             <div class="camped-container">
                 <div class="camped-nav-container">
-                    <div class="camped-nav__brand">{brand}</div>
+                    <div class="camped-nav__brand">$brand</div>
                     <div class="camped-nav__menu">
-                        {nav_items}
+                        $items
                     </div>
                 </div>
             </div>
         </nav>
-        '''
-    
-    def generate_hero(self, title: str, subtitle: str, cta_text: str = "Get Started") -> str:
-        """Generate CampEd UI Hero Section with enhanced styling"""
-        return f'''
+        ''')
+
+_HERO_TEMPLATE = string.Template('''
         <section class="camped-hero">
             <div class="camped-container">
                 <div class="camped-hero__content fade-in-up">
-                    {self.generate_typography(title, "h1")}
-                    {self.generate_typography(subtitle, "p")}
+                    $title
+                    $subtitle
                     <div class="camped-hero__actions">
-                        {self.generate_button(cta_text, "default", "lg")}
-                        {self.generate_button("Learn More", "outline", "lg")}
+                        $cta
+                        $secondary
                     </div>
                 </div>
             </div>
         </section>
-        '''
-    
-    def generate_form(self, fields: List[Dict[str, str]]) -> str:
-        """Generate CampEd UI Form with enhanced styling"""
-        form_fields = ""
-        for field in fields:
-            field_type = field.get("type", "text")
-            field_name = field.get("name", "")
-            field_label = field.get("label", "")
-            field_placeholder = field.get("placeholder", "")
-            
-            if field_type == "textarea":
-                form_fields += f'''
+        ''')
+
+_FORM_TEMPLATE = string.Template('''
+        <form class="camped-form">
+            $fields
+            <div class="camped-form__actions">
+                $submit
+            </div>
+        </form>
+        ''')
+
+# Form field markup by field type; anything without an entry renders as an <input>
+_FIELD_TEMPLATES = {
+    "textarea": '''
                 <div class="camped-form__group">
-                    <label class="camped-label" for="{field_name}">{field_label}</label>
-                    <textarea class="camped-textarea" id="{field_name}" name="{field_name}" placeholder="{field_placeholder}"></textarea>
+                    <label class="camped-label" for="{name}">{label}</label>
+                    <textarea class="camped-textarea" id="{name}" name="{name}" placeholder="{placeholder}"></textarea>
                 </div>
                 '''
-            else:
-                form_fields += f'''
+}
+
+_DEFAULT_FIELD_TEMPLATE = '''
                 <div class="camped-form__group">
-                    <label class="camped-label" for="{field_name}">{field_label}</label>
-                    <input class="camped-input" type="{field_type}" id="{field_name}" name="{field_name}" placeholder="{field_placeholder}">
+                    <label class="camped-label" for="{name}">{label}</label>
+                    <input class="camped-input" type="{type}" id="{name}" name="{name}" placeholder="{placeholder}">
                 </div>
                 '''
-        
-        return f'''
-        <form class="camped-form">
-            {form_fields}
-            <div class="camped-form__actions">
-                {self.generate_button("Submit", "default", "lg")}
-            </div>
-        </form>
-        '''
-    
-    def generate_website(self, structure: Dict[str, Any]) -> str:
-        """Generate complete website HTML with enhanced features"""
-        sections_html = ""
-        color_scheme = structure.get("color_scheme", "primary")
-        
-        for section in structure.get("sections", []):
-            section_type = section.get("type", "content")
-            section_title = section.get("title", "")
-            section_content = section.get("content", "")
-            section_props = section.get("props", {})
-            
-            if section_type == "hero":
-                sections_html += self.generate_hero(section_title, section_content)
-                
-            elif section_type == "navigation":
-                links = section_props.get("links", [])
-                sections_html += self.generate_navigation(section_title, links)
-                
-            elif section_type == "cards" or section_type == "features":
-                cards = section_props.get("cards", [])
-                cards_html = ""
-                for card in cards:
-                    cards_html += self.generate_card(
-                        card.get("title", ""),
-                        card.get("content", ""),
-                        card.get("footer", "")
-                    )
-                sections_html += f'''
+
+_CARDS_SECTION_TEMPLATE = string.Template('''
                 <section class="camped-section">
                     <div class="camped-container">
-                        {self.generate_typography(section_title, "h2")}
+                        $title
                         <div class="camped-grid camped-grid-3">
-                            {cards_html}
+                            $cards
                         </div>
                     </div>
                 </section>
-                '''
-                
-            elif section_type == "contact":
-                fields = section_props.get("fields", [])
-                sections_html += f'''
+                ''')
+
+_CONTACT_SECTION_TEMPLATE = string.Template('''
                 <section class="camped-section">
                     <div class="camped-container">
-                        {self.generate_typography(section_title, "h2")}
-                        <p class="camped-typography--p" style="text-align: center; margin-bottom: 3rem;">{section_content}</p>
-                        {self.generate_form(fields)}
+                        $title
+                        <p class="camped-typography--p" style="text-align: center; margin-bottom: 3rem;">$content</p>
+                        $form
                     </div>
                 </section>
-                '''
-                
-            else:  # content section
-                sections_html += f'''
+                ''')
+
+_CONTENT_SECTION_TEMPLATE = string.Template('''
                 <section class="camped-section">
                     <div class="camped-container">
-                        {self.generate_typography(section_title, "h2")}
-                        {self.generate_typography(section_content, "p")}
+                        $title
+                        $content
                     </div>
                 </section>
-                '''
-        
-        # Complete HTML document
-        return f'''
+                ''')
+
+_DOCUMENT_HEAD_TEMPLATE = string.Template('''
         <!DOCTYPE html>
         <html lang="en">
         <head>
             <meta charset="UTF-8">
             <meta name="viewport" content="width=device-width, initial-scale=1.0">
-            <title>{structure.get("title", "AI Generated Website")}</title>
-            <meta name="description" content="{structure.get("description", "")}">
-            {self.get_camped_css(color_scheme)}
+            <title>$title</title>
+            <meta name="description" content="$description">
+            ''')
+
+_DOCUMENT_BODY_START = '''
         </head>
         <body>
-            {sections_html}
+            '''
+
+_DOCUMENT_END = '''
             <footer class="camped-section" style="background: var(--camped-muted); text-align: center;">
                 <div class="camped-container">
                     <p class="camped-typography--p">© 2024 Generated with CampEd UI & Gemini AI • Built with ❤️</p>
@@ -702,8 +856,224 @@ class CampEdUIGenerator:
         </html>
         '''
 
+class CampEdUIGenerator:
+    """Enhanced CampEd UI Component Generator with real styling"""
+    
+    def __init__(self):
+        self.base_cdn = "https://cdn.jsdelivr.net/npm/@camped/ui@latest"
+        
+    def get_camped_css(self, color_scheme: str = "primary") -> str:
+        """Get enhanced CampEd UI CSS with color schemes"""
+        css_by_scheme = _css_by_scheme()
+        return css_by_scheme.get(color_scheme, css_by_scheme["primary"])
+    
+    def generate_button(self, text: str, variant: str = "default", size: str = "default") -> str:
+        """Generate CampEd UI Button with enhanced styling"""
+        return _BUTTON_TAGS[(variant, size)] + esc(text) + '</button>'
+    
+    def generate_card(self, title: str, content: str, footer: str = "") -> str:
+        """Generate CampEd UI Card with enhanced styling"""
+        footer_html = f'<div class="camped-card__footer">{esc(footer)}</div>' if footer else ''
+        return _CARD_TEMPLATE.substitute(title=esc(title), content=esc(content), footer=footer_html)
+    
+    def generate_typography(self, text: str, variant: str = "p") -> str:
+        """Generate CampEd UI Typography (variant is one of h1-h6 or p)"""
+        prefix, suffix = _TYPOGRAPHY_TAGS[variant]
+        return prefix + esc(text) + suffix
+    
+    def generate_navigation(self, brand: str, links: List[Dict[str, str]]) -> str:
+        """Generate CampEd UI Navigation with enhanced styling"""
+        nav_items = "".join(
+            f'<a href="{safe_href(link.get("href", "#"))}" class="camped-nav__link">{esc(link.get("text", ""))}</a>'
+            for link in links
+        )
+        
+        return _NAVIGATION_TEMPLATE.substitute(brand=esc(brand), items=nav_items)
+    
+    def generate_hero(self, title: str, subtitle: str, cta_text: str = "Get Started") -> str:
+        """Generate CampEd UI Hero Section with enhanced styling"""
+        return _HERO_TEMPLATE.substitute(
+            title=self.generate_typography(title, "h1"),
+            subtitle=self.generate_typography(subtitle, "p"),
+            cta=self.generate_button(cta_text, "default", "lg"),
+            secondary=self.generate_button("Learn More", "outline", "lg")
+        )
+    
+    def generate_form(self, fields: List[Dict[str, str]]) -> str:
+        """Generate CampEd UI Form with enhanced styling"""
+        form_fields: List[str] = []
+        for field in fields:
+            field_type = field.get("type", "text")
+            template = _FIELD_TEMPLATES.get(field_type, _DEFAULT_FIELD_TEMPLATE)
+            form_fields.append(template.format(
+                type=esc(field_type),
+                name=esc(field.get("name", "")),
+                label=esc(field.get("label", "")),
+                placeholder=esc(field.get("placeholder", ""))
+            ))
+        
+        return _FORM_TEMPLATE.substitute(
+            fields="".join(form_fields),
+            submit=self.generate_button("Submit", "default", "lg")
+        )
+    
+    def generate_website(self, structure: Dict[str, Any]) -> str:
+        """Generate complete website HTML with enhanced features"""
+        document = io.StringIO()
+        self.write_website(document, structure)
+        return document.getvalue()
+
+    def write_website(self, out: TextIO, structure: Dict[str, Any]) -> None:
+        """Write the complete website HTML to ``out`` piece by piece as each section is rendered"""
+        color_scheme = structure.get("color_scheme", "primary")
+
+        out.write(_DOCUMENT_HEAD_TEMPLATE.substitute(
+            title=esc(structure.get("title", "AI Generated Website")),
+            description=esc(structure.get("description", ""))
+        ))
+        out.write(self.get_camped_css(color_scheme))
+        out.write(_DOCUMENT_BODY_START)
+
+        for section in structure.get("sections", []):
+            section_type = section.get("type", "content")
+            section_title = section.get("title", "")
+            section_content = section.get("content", "")
+            section_props = section.get("props", {})
+            
+            if section_type == "hero":
+                out.write(self.generate_hero(section_title, section_content))
+                
+            elif section_type == "navigation":
+                links = section_props.get("links", [])
+                out.write(self.generate_navigation(section_title, links))
+                
+            elif section_type == "cards" or section_type == "features":
+                cards = section_props.get("cards", [])
+                cards_html = "".join(
+                    self.generate_card(
+                        card.get("title", ""),
+                        card.get("content", ""),
+                        card.get("footer", "")
+                    )
+                    for card in cards
+                )
+                out.write(_CARDS_SECTION_TEMPLATE.substitute(
+                    title=self.generate_typography(section_title, "h2"),
+                    cards=cards_html
+                ))
+                
+            elif section_type == "contact":
+                fields = section_props.get("fields", [])
+                out.write(_CONTACT_SECTION_TEMPLATE.substitute(
+                    title=self.generate_typography(section_title, "h2"),
+                    content=esc(section_content),
+                    form=self.generate_form(fields)
+                ))
+                
+            else:  # content section
+                out.write(_CONTENT_SECTION_TEMPLATE.substitute(
+                    title=self.generate_typography(section_title, "h2"),
+                    content=self.generate_typography(section_content, "p")
+                ))
+        
+        out.write(_DOCUMENT_END)
+
+@st.cache_resource(show_spinner=False)
+def _fallback_html(color_scheme: str, layout_type: str) -> str:
+    """Fallback page for an API failure; rendered the first time a combination fails, then shared"""
+    return CampEdUIGenerator().generate_website(_fallback_structure(color_scheme, layout_type))
+
+@st.cache_resource(show_spinner=False)
+def get_generators(api_key: str):
+    """Shared Gemini and CampEd generators for an API key, kept alive across reruns"""
+    return GeminiWebsiteGenerator(api_key), CampEdUIGenerator()
+
+def _api_key_hash(api_key: str) -> str:
+    """Short digest of the API key, used in cache keys instead of the raw key"""
+    return hashlib.blake2b(api_key.encode(), digest_size=8).hexdigest()
+
+class _StructureMemo:
+    """Thread-safe LRU of generated structure JSON, shared by every session
+
+    Used instead of ``st.cache_data`` so the streaming preview, which only runs on a
+    miss, is not recorded with the entry and replayed on every hit.
+    """
+
+    def __init__(self, max_entries: int = 64, ttl: float = 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, structure_json = entry
+            if time.time() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return structure_json
+
+    def put(self, key: tuple, structure_json: str):
+        with self._lock:
+            self._entries[key] = (time.time(), structure_json)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+@st.cache_resource(show_spinner=False)
+def _get_structure_memo() -> _StructureMemo:
+    return _StructureMemo()
+
+def _generate_structure_json(gemini: GeminiWebsiteGenerator, ui: CampEdUIGenerator, api_key_hash: str,
+                            prompt: str, color_scheme: str, layout_type: str) -> str:
+    """Website structure JSON, generated once per (API key, prompt, color scheme, layout)
+
+    Only a miss calls Gemini, streaming each completed section into a temporary
+    preview. The result is stored after it succeeds, so failures are never cached.
+    """
+    key = (api_key_hash, prompt, color_scheme, layout_type)
+    memo = _get_structure_memo()
+    structure_json = memo.get(key)
+    if structure_json is not None:
+        return structure_json
+
+    partial_preview = st.empty()
+
+    def show_partial(partial_structure):
+        with partial_preview:
+            st.components.v1.html(
+                ui.generate_website(partial_structure),
+                height=800,
+                scrolling=True
+            )
+
+    try:
+        structure = gemini.generate_website_structure(
+            prompt,
+            color_scheme,
+            layout_type,
+            on_section=show_partial
+        )
+    finally:
+        partial_preview.empty()
+
+    structure_json = json.dumps(structure, indent=2)
+    memo.put(key, structure_json)
+    return structure_json
+
+@st.cache_data(ttl=3600, max_entries=64, show_spinner=False)
+def _render_website_cached(_ui: CampEdUIGenerator, structure_json: str) -> str:
+    """Render a structure to HTML; keyed on its JSON text, which hashes cheaper than the dict"""
+    return _ui.generate_website(json.loads(structure_json))
+
 # Enhanced Templates
+@st.cache_resource(show_spinner=False)
 def get_enhanced_templates():
+    """Template descriptions by name; built once and shared read-only across reruns"""
     return {
         "Custom": "",
         "Tech Startup": """Create a modern tech startup landing page for an AI-powered productivity tool. 
@@ -746,6 +1116,267 @@ def get_enhanced_templates():
         and application form with scholarship info."""
     }
 
+# Example descriptions offered before the first generation
+EXAMPLE_PROMPTS = (
+    "A modern SaaS landing page for a project management tool with pricing tiers",
+    "Creative portfolio website for a graphic designer with project gallery",
+    "Restaurant website with menu, reservations, and location details",
+    "Tech startup page for an AI writing assistant with feature showcase",
+    "Online course platform with instructor profiles and course catalog"
+)
+
+# Enhancement toggles (widget keys) and the requirement line for on / off
+PROMPT_FRAGMENTS = {
+    "include_animations": ("Include animations and transitions", "Minimal animations"),
+    "include_icons": ("Use Font Awesome icons", "Text-only elements"),
+    "responsive_design": ("Mobile-first responsive design", "Desktop-focused"),
+    "modern_gradients": ("Modern gradients and visual effects", "Flat design"),
+    "interactive_elements": ("Interactive hover effects and micro-interactions", "Static elements"),
+    "accessibility_features": ("WCAG accessibility compliance", "Basic accessibility"),
+    "include_placeholder_images": ("Include placeholder images with proper alt text", "Text-only content")
+}
+
+@st.cache_data(show_spinner=False)
+def _requirement_lines(flags: tuple) -> str:
+    """Requirement bullets for the toggles in ``PROMPT_FRAGMENTS`` order, built once per combination"""
+    return "\n".join(
+        f"        - {fragments[0 if on else 1]}"
+        for fragments, on in zip(PROMPT_FRAGMENTS.values(), flags)
+    )
+
+def _settings_fingerprint(state) -> int:
+    """Integer signature of every setting that feeds a generation
+
+    Change detection is a single int compare against ``last_settings_fp``.
+    """
+    return hash((
+        state.user_prompt,
+        state.selected_template,
+        state.color_scheme,
+        state.layout_type,
+        state.temperature,
+        state.include_animations,
+        state.include_icons,
+        state.responsive_design,
+        state.modern_gradients,
+        state.interactive_elements,
+        state.accessibility_features,
+        state.max_sections,
+        state.content_depth,
+        state.include_placeholder_images
+    ))
+
+def run_generation() -> bool:
+    """Generate a website from the current settings and store it in session state"""
+    state = st.session_state
+    api_key = state.api_key
+    user_prompt = state.user_prompt
+    color_scheme = state.color_scheme
+    layout_type = state.layout_type
+    settings_fp = _settings_fingerprint(state)
+    state.last_generation_time = time.time()
+
+    # Shared generators (cached per API key)
+    gemini_generator, ui_generator = get_generators(api_key)
+
+    with st.spinner("🤖 AI is crafting your website..."):
+        # Enhanced prompt with user preferences
+        enhanced_prompt = f"""
+        {user_prompt}
+        
+        Additional Requirements:
+        - Include {state.max_sections} main sections maximum
+        - Content detail level: {state.content_depth}
+{_requirement_lines(tuple(bool(state[key]) for key in PROMPT_FRAGMENTS))}
+        
+        Make it professional, modern, and fully functional with real CampEd UI components.
+        """
+        
+        try:
+            # Generate structure (cached per prompt and design settings)
+            try:
+                structure_json = _generate_structure_json(
+                    gemini_generator,
+                    ui_generator,
+                    _api_key_hash(api_key),
+                    enhanced_prompt,
+                    color_scheme,
+                    layout_type
+                )
+            except Exception as e:
+                # Shown by the preview panel, which may only render after a rerun
+                st.session_state.generation_error = f"Gemini API Error: {str(e)}"
+                # Deterministic fallback page, cached per combination; the shared
+                # structure is only serialized, so it needs no copy
+                website_html = _fallback_html(color_scheme, layout_type)
+                structure_json = json.dumps(_fallback_structure(color_scheme, layout_type), indent=2)
+            else:
+                # Serialized once; also the render cache key, Structure tab and download
+                website_html = _render_website_cached(ui_generator, structure_json)
+            
+            # Update session state
+            st.session_state.generation_count += 1
+            st.session_state.last_settings_fp = settings_fp
+            st.session_state.current_website = website_html
+            st.session_state.current_website_gz = gzip.compress(website_html.encode("utf-8"), compresslevel=6)
+            st.session_state.current_structure_json = structure_json
+            
+            st.session_state.generation_notice = (
+                f"✅ Website generated successfully! (Generation #{st.session_state.generation_count})"
+            )
+            return True
+            
+        except Exception as e:
+            # Remembered so real-time mode does not retry until the settings change;
+            # shown by the preview panel like API errors
+            st.session_state.failed_settings_fp = settings_fp
+            st.session_state.generation_error = f"❌ Generation failed: {str(e)}"
+            return False
+
+def debounced_generate():
+    """Real-time mode: regenerate when the settings changed and the delay has passed
+
+    Called as a fragment with ``run_every`` set to the generation delay, so a change
+    made too soon after the last generation is picked up on a later tick without
+    rerunning the whole app.
+    """
+    state = st.session_state
+    if not state.user_prompt.strip():
+        return
+    settings_fp = _settings_fingerprint(state)
+    if settings_fp in (state.get('last_settings_fp'), state.get('failed_settings_fp')):
+        return
+    if time.time() - state.get('last_generation_time', 0) <= state.generation_delay:
+        return
+
+    run_generation()
+    # Refresh the preview panel and statistics with the new website or error
+    st.rerun()
+
+@st.fragment
+def copy_html_button():
+    """Copy HTML button; a fragment so a click reruns only the button, not the preview iframe"""
+    if st.button("📋 Copy HTML"):
+        st.code(st.session_state.current_website)
+        st.success("Code displayed above - copy manually")
+
+def _set_example(example: str):
+    """Load the clicked example description into the prompt box"""
+    st.session_state.user_prompt = example
+
+def example_descriptions():
+    """Example descriptions offered before the first generation"""
+    clicked = False
+    with st.expander("💡 Example Descriptions"):
+        for i, example in enumerate(EXAMPLE_PROMPTS):
+            if st.button(
+                f"📝 {example[:50]}...",
+                key=f"example_{i}",
+                on_click=_set_example,
+                args=(example,)
+            ):
+                clicked = True
+
+    if clicked:
+        # The prompt box lives outside the preview fragment, so rerun the whole app
+        st.rerun()
+
+@st.fragment
+def preview_panel():
+    """Generation controls and live preview
+
+    Runs as a fragment, so its own buttons rerun only this panel. All inputs are
+    read from widget state rather than passed in.
+    """
+    state = st.session_state
+
+    # Manual generation button
+    manual_generate = st.button(
+        "🚀 Generate Website", 
+        type="primary",
+        disabled=not state.user_prompt.strip(),
+        help="Generate your website based on the description"
+    )
+    
+    if manual_generate and state.user_prompt.strip():
+        run_generation()
+
+    # Result of the latest generation, shown once
+    generation_error = state.pop('generation_error', None)
+    if generation_error:
+        st.error(generation_error)
+
+    generation_notice = state.pop('generation_notice', None)
+    if generation_notice:
+        st.success(generation_notice)
+        
+        # Display structure info
+        with st.expander("📋 Website Structure"):
+            st.json(state.current_structure_json)
+    
+    # Display generated website
+    if 'current_website' in st.session_state:
+        st.subheader("🌐 Your Generated Website")
+        
+        # Tabs for different views
+        tab1, tab2, tab3 = st.tabs(["🖥️ Preview", "📝 HTML Code", "⚙️ Structure"])
+        
+        with tab1:
+            st.components.v1.html(
+                st.session_state.current_website,
+                height=800,
+                scrolling=True
+            )
+        
+        with tab2:
+            st.code(st.session_state.current_website, language='html')
+            copy_html_button()
+        
+        with tab3:
+            if 'current_structure_json' in st.session_state:
+                st.json(st.session_state.current_structure_json)
+        
+        # Download options, all stamped with the same time
+        now_i = int(time.time())
+        st.subheader("💾 Download Options")
+        col_dl1, col_dl2, col_dl3 = st.columns(3)
+        
+        with col_dl1:
+            st.download_button(
+                "📄 Download HTML",
+                data=st.session_state.current_website,
+                file_name=f"camped_website_{now_i}.html",
+                mime="text/html"
+            )
+        
+        with col_dl2:
+            if 'current_structure_json' in st.session_state:
+                st.download_button(
+                    "📊 Download JSON",
+                    data=st.session_state.current_structure_json,
+                    file_name=f"website_structure_{now_i}.json",
+                    mime="application/json"
+                )
+        
+        with col_dl3:
+            # Compressed once at generation time; the markup is highly repetitive
+            if 'current_website_gz' in st.session_state:
+                st.download_button(
+                    "📦 Download Compressed",
+                    data=st.session_state.current_website_gz,
+                    file_name=f"camped_website_{now_i}.html.gz",
+                    mime="application/gzip"
+                )
+    
+    else:
+        st.info("👋 Enter a website description above to generate your site!")
+        
+        example_descriptions()
+
+def _apply_template():
+    """Load the selected template's description into the prompt box"""
+    st.session_state.user_prompt = get_enhanced_templates()[st.session_state.selected_template]
+
 # Streamlit App with Enhanced Features
 def main():
     st.set_page_config(
@@ -757,8 +1388,8 @@ def main():
     # Initialize session state
     if 'generation_count' not in st.session_state:
         st.session_state.generation_count = 0
-    if 'last_settings' not in st.session_state:
-        st.session_state.last_settings = {}
+    if 'user_prompt' not in st.session_state:
+        st.session_state.user_prompt = ""
     
     st.title("🚀 PromptPixel-You give the prompt, we paint the pixels.")
     st.markdown("**Real-time AI-powered website generation using Google Gemini 2.0 Flash & CampEd UI**")
@@ -770,6 +1401,7 @@ def main():
         # Google Gemini API Key
         api_key = st.text_input(
             "Google Gemini API Key",
+            key="api_key",
             type="password",
             help="Get your API key from Google AI Studio",
             placeholder="Enter your Gemini API key..."
@@ -784,23 +1416,26 @@ def main():
         
         # Model Parameters
         st.subheader("🤖 AI Model Settings")
-        temperature = st.slider(
+        st.slider(
             "Creativity Level", 
             0.1, 1.0, 0.7, 0.1,
+            key="temperature",
             help="Higher values = more creative, Lower values = more focused"
         )
         
         # CampEd UI Settings
         st.subheader("🎨 Design Settings")
-        color_scheme = st.selectbox(
+        st.selectbox(
             "Color Scheme", 
-            ["primary", "secondary", "accent"],
+            COLOR_SCHEMES,
+            key="color_scheme",
             help="Choose the main color theme"
         )
         
-        layout_type = st.selectbox(
+        st.selectbox(
             "Layout Style", 
-            ["default", "centered", "wide"],
+            LAYOUT_TYPES,
+            key="layout_type",
             help="Choose the overall layout approach"
         )
         
@@ -809,14 +1444,16 @@ def main():
         realtime_mode = st.checkbox(
             "Enable Real-time Generation", 
             value=True,
+            key="realtime_mode",
             help="Generate as you type (requires API key)"
         )
         
         if realtime_mode:
             st.success("🔄 Real-time mode active")
-            generation_delay = st.slider(
+            st.slider(
                 "Generation Delay (seconds)", 
                 0.5, 3.0, 1.0, 0.5,
+                key="generation_delay",
                 help="Delay before auto-generation triggers"
             )
         else:
@@ -841,21 +1478,24 @@ def main():
         selected_template = st.selectbox(
             "Choose Template",
             list(templates.keys()),
+            key="selected_template",
+            on_change=_apply_template,
             help="Select a template or choose 'Custom' for your own idea"
         )
         
-        # User Input
+        # User Input (kept in session state so the preview fragment can read it)
         if selected_template == "Custom":
-            user_prompt = st.text_area(
+            st.text_area(
                 "Describe your website:",
+                key="user_prompt",
                 height=200,
                 placeholder="Describe the website you want to create...\nExample: A modern fitness app landing page with workout plans, trainer profiles, and membership signup",
                 help="Be specific about the type of website, key sections, and features you want"
             )
         else:
-            user_prompt = st.text_area(
+            st.text_area(
                 f"Template: {selected_template}",
-                value=templates[selected_template],
+                key="user_prompt",
                 height=200,
                 help="You can modify this template description or use it as-is"
             )
@@ -865,185 +1505,31 @@ def main():
         col_a, col_b = st.columns(2)
         
         with col_a:
-            include_animations = st.checkbox("✨ Animations", value=True)
-            include_icons = st.checkbox("🎨 Icons", value=True)
-            responsive_design = st.checkbox("📱 Mobile-First", value=True)
+            st.checkbox("✨ Animations", value=True, key="include_animations")
+            st.checkbox("🎨 Icons", value=True, key="include_icons")
+            st.checkbox("📱 Mobile-First", value=True, key="responsive_design")
         
         with col_b:
-            modern_gradients = st.checkbox("🌈 Modern Gradients", value=True)
-            interactive_elements = st.checkbox("🖱️ Interactive Elements", value=True)
-            accessibility_features = st.checkbox("♿ Accessibility", value=True)
+            st.checkbox("🌈 Modern Gradients", value=True, key="modern_gradients")
+            st.checkbox("🖱️ Interactive Elements", value=True, key="interactive_elements")
+            st.checkbox("♿ Accessibility", value=True, key="accessibility_features")
         
         # Advanced Settings
         with st.expander("⚙️ Advanced Settings"):
-            max_sections = st.slider("Max Sections", 3, 10, 6)
-            content_depth = st.select_slider(
+            st.slider("Max Sections", 3, 10, 6, key="max_sections")
+            st.select_slider(
                 "Content Detail Level",
                 options=["Minimal", "Standard", "Detailed", "Comprehensive"],
-                value="Standard"
+                value="Standard",
+                key="content_depth"
             )
-            include_placeholder_images = st.checkbox("🖼️ Placeholder Images", value=True)
+            st.checkbox("🖼️ Placeholder Images", value=True, key="include_placeholder_images")
     
     with col2:
         st.header("🎨 Live Preview & Generation")
-        
-        # Initialize generators
-        if api_key:
-            gemini_generator = GeminiWebsiteGenerator(api_key)
-            ui_generator = CampEdUIGenerator()
-        
-        # Real-time generation logic
-        current_settings = {
-            'prompt': user_prompt,
-            'template': selected_template,
-            'color_scheme': color_scheme,
-            'layout_type': layout_type,
-            'temperature': temperature,
-            'enhancements': {
-                'animations': include_animations,
-                'icons': include_icons,
-                'responsive': responsive_design,
-                'gradients': modern_gradients,
-                'interactive': interactive_elements,
-                'accessibility': accessibility_features
-            }
-        }
-        
-        # Check if settings changed for real-time mode
-        settings_changed = current_settings != st.session_state.last_settings
-        should_generate = False
-        
-        if realtime_mode and settings_changed and user_prompt.strip():
-            if 'last_generation_time' not in st.session_state:
-                st.session_state.last_generation_time = 0
-            
-            current_time = time.time()
-            if current_time - st.session_state.last_generation_time > generation_delay:
-                should_generate = True
-                st.session_state.last_generation_time = current_time
-        
-        # Manual generation button
-        manual_generate = st.button(
-            "🚀 Generate Website", 
-            type="primary",
-            disabled=not user_prompt.strip(),
-            help="Generate your website based on the description"
-        )
-        
-        if should_generate or manual_generate:
-            if user_prompt.strip():
-                with st.spinner("🤖 AI is crafting your website..."):
-                    # Enhanced prompt with user preferences
-                    enhanced_prompt = f"""
-                    {user_prompt}
-                    
-                    Additional Requirements:
-                    - Include {max_sections} main sections maximum
-                    - Content detail level: {content_depth}
-                    - {'Include animations and transitions' if include_animations else 'Minimal animations'}
-                    - {'Use Font Awesome icons' if include_icons else 'Text-only elements'}
-                    - {'Mobile-first responsive design' if responsive_design else 'Desktop-focused'}
-                    - {'Modern gradients and visual effects' if modern_gradients else 'Flat design'}
-                    - {'Interactive hover effects and micro-interactions' if interactive_elements else 'Static elements'}
-                    - {'WCAG accessibility compliance' if accessibility_features else 'Basic accessibility'}
-                    - {'Include placeholder images with proper alt text' if include_placeholder_images else 'Text-only content'}
-                    
-                    Make it professional, modern, and fully functional with real CampEd UI components.
-                    """
-                    
-                    try:
-                        # Generate structure
-                        structure = gemini_generator.generate_website_structure(
-                            enhanced_prompt, 
-                            color_scheme, 
-                            layout_type
-                        )
-                        
-                        # Generate HTML
-                        website_html = ui_generator.generate_website(structure)
-                        
-                        # Update session state
-                        st.session_state.generation_count += 1
-                        st.session_state.last_settings = current_settings
-                        st.session_state.current_website = website_html
-                        st.session_state.current_structure = structure
-                        
-                        st.success(f"✅ Website generated successfully! (Generation #{st.session_state.generation_count})")
-                        
-                        # Display structure info
-                        with st.expander("📋 Website Structure"):
-                            st.json(structure)
-                        
-                    except Exception as e:
-                        st.error(f"❌ Generation failed: {str(e)}")
-        
-        # Display generated website
-        if 'current_website' in st.session_state:
-            st.subheader("🌐 Your Generated Website")
-            
-            # Tabs for different views
-            tab1, tab2, tab3 = st.tabs(["🖥️ Preview", "📝 HTML Code", "⚙️ Structure"])
-            
-            with tab1:
-                st.components.v1.html(
-                    st.session_state.current_website,
-                    height=800,
-                    scrolling=True
-                )
-            
-            with tab2:
-                st.code(st.session_state.current_website, language='html')
-                if st.button("📋 Copy HTML"):
-                    st.code(st.session_state.current_website)
-                    st.success("Code displayed above - copy manually")
-            
-            with tab3:
-                if 'current_structure' in st.session_state:
-                    st.json(st.session_state.current_structure)
-            
-            # Download options
-            st.subheader("💾 Download Options")
-            col_dl1, col_dl2, col_dl3 = st.columns(3)
-            
-            with col_dl1:
-                st.download_button(
-                    "📄 Download HTML",
-                    data=st.session_state.current_website,
-                    file_name=f"camped_website_{int(time.time())}.html",
-                    mime="text/html"
-                )
-            
-            with col_dl2:
-                if 'current_structure' in st.session_state:
-                    st.download_button(
-                        "📊 Download JSON",
-                        data=json.dumps(st.session_state.current_structure, indent=2),
-                        file_name=f"website_structure_{int(time.time())}.json",
-                        mime="application/json"
-                    )
-            
-            with col_dl3:
-                # Create a zip file with both HTML and JSON
-                if st.button("📦 Download Package"):
-                    st.info("💡 Use individual download buttons above")
-        
-        else:
-            st.info("👋 Enter a website description above to generate your site!")
-            
-            # Show example
-            with st.expander("💡 Example Descriptions"):
-                examples = [
-                    "A modern SaaS landing page for a project management tool with pricing tiers",
-                    "Creative portfolio website for a graphic designer with project gallery",
-                    "Restaurant website with menu, reservations, and location details",
-                    "Tech startup page for an AI writing assistant with feature showcase",
-                    "Online course platform with instructor profiles and course catalog"
-                ]
-                
-                for example in examples:
-                    if st.button(f"📝 {example[:50]}...", key=f"example_{hash(example)}"):
-                        st.session_state.example_prompt = example
-                        st.rerun()
+        if realtime_mode:
+            st.fragment(run_every=st.session_state.generation_delay)(debounced_generate)()
+        preview_panel()
 
     # Footer
     st.markdown("---")